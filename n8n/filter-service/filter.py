@@ -1,35 +1,144 @@
+import hashlib
 import json
+import re
+import threading
+from collections import OrderedDict
+import numpy as np
 import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
 from datetime import datetime
-import io, os
+from functools import lru_cache, partial
+import os
+import orjson
 
-from flask import Flask, request, jsonify, make_response
+try:
+    import ahocorasick
+except ImportError:
+    ahocorasick = None
+
+from flask import Flask, request, abort
+from werkzeug.http import http_date
 
 app = Flask(__name__)
 
 # ---- CONFIGURATION FOR EXPENSE DOCUMENTS ----
 EXPENSE_CONFIG = 'expense_cfg.json'
-template_stru = {}
 
-try:
-    with open(EXPENSE_CONFIG, 'r') as file:
-        template_full = json.load(file)
-        template_stru = template_full.get("expense_report_paradigm",{})
-except Exception as e:
-    print(f"❌ ERROR LOADING CONFIG FILE: {e}")
-    pass
-
-def validate_expense_report(df, req):
+@lru_cache(maxsize=4)
+def _load_template(mtime_ns):
+    # Keyed on the config mtime, so edits are picked up without a restart
+    template_stru = {}
+    try:
+        with open(EXPENSE_CONFIG, 'r') as file:
+            template_full = json.load(file)
+            template_stru = template_full.get("expense_report_paradigm",{})
+    except Exception as e:
+        print(f"❌ ERROR LOADING CONFIG FILE: {e}")
+
+    # Column sets derived once per config version, reused by every /verifyfile call
+    required_cols = frozenset(col for col, data in template_stru.items() if data.get("required"))
+    known_cols = frozenset(template_stru)
+    float_cols = [col for col, data in template_stru.items() if 'float' in data.get('dtype', '')]
+    datetime_cols = [col for col, data in template_stru.items() if 'datetime' in data.get('dtype', '')]
+
+    # Validator specialized to this template version, so handlers only pass the frame
+    return {
+        "template": template_stru,
+        "validate": partial(
+            validate_expense_report,
+            required_cols=required_cols,
+            known_cols=known_cols,
+            float_cols=float_cols,
+            datetime_cols=datetime_cols,
+        ),
+    }
+
+def load_template():
+    try:
+        mtime_ns = os.stat(EXPENSE_CONFIG).st_mtime_ns
+    except OSError:
+        mtime_ns = None
+    return _load_template(mtime_ns)
+
+# ---- JSON HANDLING ----
+# RFC 822 layout used by werkzeug's http_date, which jsonify emitted for dates
+HTTP_DATE_FORMAT = "%a, %d %b %Y %H:%M:%S GMT"
+
+def _json_default(value):
+    # Keep the RFC 822 date format jsonify produced; NaT/NaN become null
+    if value is pd.NaT:
+        return None
+    if isinstance(value, datetime):
+        return http_date(value)
+    raise TypeError
+
+# orjson only keeps integers within 64 bits exactly and turns larger ones into
+# floats. Bodies containing a 20+ digit run might hold such an integer, so they
+# are parsed with the stdlib instead (a digit run inside a string just costs speed).
+_LONG_DIGIT_RUN = re.compile(rb"\d{20,}")
+
+def read_json():
+    # Keep the content-type check request.get_json() used to enforce
+    if not request.is_json:
+        abort(415)
+    body = request.get_data()
+    try:
+        if _LONG_DIGIT_RUN.search(body):
+            return json.loads(body)
+        return orjson.loads(body)
+    except ValueError:
+        abort(400)
+
+def json_response(payload):
+    options = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_PASSTHROUGH_DATETIME
+    try:
+        body = orjson.dumps(payload, default=_json_default, option=options)
+    except orjson.JSONEncodeError:
+        # Integers beyond 64 bits (see read_json) need the stdlib encoder
+        body = json.dumps(payload, default=_json_default, separators=(",", ":"))
+    return app.response_class(body, mimetype="application/json")
+
+# NaT is stored as the smallest int64 in a datetime64 array
+_NAT_I8 = np.iinfo(np.int64).min
+
+def flag_future_dates(dates_i8, now_i8):
+    # Fill missing dates with now and flag dates after now, on raw int64 ticks
+    dates_i8 = np.where(dates_i8 == _NAT_I8, now_i8, dates_i8)
+    return dates_i8, dates_i8 > now_i8
+
+def dataframe_records(df):
+    # Arrow builds the row dicts in C++. Frames it can't convert take the
+    # pandas path instead:
+    # - mixed-type object columns (e.g. IDs 1 and "T2") have no single arrow type
+    # - integers between 2**63 and 2**64 (long card/transaction IDs) overflow int64
+    try:
+        table = pa.Table.from_pandas(df, preserve_index=False)
+    except (pa.ArrowInvalid, pa.ArrowTypeError, OverflowError):
+        # Missing values become None so the stdlib encoder fallback never
+        # emits NaN; orjson already writes them as null
+        return df.astype(object).where(df.notna(), None).to_dict(orient="records")
+
+    # Format timestamps in arrow so the rows hold only JSON-native values and
+    # orjson never has to call back into Python for a date cell
+    for index, field in enumerate(table.schema):
+        if pa.types.is_timestamp(field.type):
+            # Floor first: a plain cast truncates toward zero, which rounds
+            # pre-epoch sub-second values up to the next second
+            floored = pc.floor_temporal(table.column(index), unit="second")
+            seconds = pc.cast(floored, pa.timestamp("s"))
+            table = table.set_column(index, field.name, pc.strftime(seconds, format=HTTP_DATE_FORMAT, locale="C"))
+    return table.to_pylist()
+
+def validate_expense_report(df, required_cols, known_cols, float_cols, datetime_cols):
     result = {
         "is_valid": True,
         "validated_df": df
     }
     
-    df_to_validate = df.copy()
-        
-    # Expected number of colums for an expense report
-    required_cols = {col for col, data in req.items() if data.get("required")}
-    
+    # Validate in place; columns are only reassigned when coercion is needed
+    df_to_validate = df
+
     # Number of columns in the received expense report
     received_cols = set(df_to_validate.columns)   
     
@@ -41,30 +150,29 @@ def validate_expense_report(df, req):
         return result
     
     # If extra columns are present, drop them and continue processing
-    extra_columns = received_cols - set(req.keys())
+    extra_columns = received_cols - known_cols
     if extra_columns:
         df_to_validate = df_to_validate.drop(columns=list(extra_columns))
         print(f"Extra columns were present.  Dropping: {extra_columns}")
 
-    for col, data in req.items():
-        target_type = data['dtype']
-        try:
-            if 'float' in target_type:
+    for col in float_cols:
+        if col in df_to_validate.columns and not pd.api.types.is_numeric_dtype(df_to_validate[col]):
+            try:
                 df_to_validate[col] = pd.to_numeric(df_to_validate[col], errors='coerce')
-            elif 'datetime' in target_type:
+            except Exception as e:
+                print(f"Critical Error: {e}")
+
+    for col in datetime_cols:
+        if col in df_to_validate.columns and not pd.api.types.is_datetime64_any_dtype(df_to_validate[col]):
+            try:
                 df_to_validate[col] = pd.to_datetime(df_to_validate[col], errors='coerce')
-        except Exception as e:
-            print(f"Critical Error: {e}")
+            except Exception as e:
+                print(f"Critical Error: {e}")
     
-    missing = False
-    val = {}
-    for col in required_cols:
-        missing_values = df_to_validate[col].isnull().sum()
-        if missing_values > 0:
-            val[col] = int(missing_values)
-            missing = True
+    # One vectorized null sweep over all required columns
+    null_mask = df_to_validate[list(required_cols)].isna()
     
-    if missing:
+    if null_mask.any().any():
         result["is_valid"] = False
         return result
     
@@ -72,90 +180,158 @@ def validate_expense_report(df, req):
     current_datetime = datetime.now()
     
     if 'DateSubmitted' in df_to_validate.columns:
-        df_to_validate["DateSubmitted"] = pd.to_datetime(df_to_validate["DateSubmitted"], errors="coerce")
-        df_to_validate["DateSubmitted"] = df_to_validate['DateSubmitted'].fillna(current_datetime)
-    
-        invalid_dates_mask =  df_to_validate['DateSubmitted'] > current_datetime
+        # Already parsed by the datetime_cols pass when the template types it
+        date_submitted = df_to_validate["DateSubmitted"]
+        if not pd.api.types.is_datetime64_any_dtype(date_submitted):
+            date_submitted = pd.to_datetime(date_submitted, errors="coerce")
+        # Work in the column's own resolution so far-future dates don't overflow
+        dates = date_submitted.to_numpy()
+        unit, _ = np.datetime_data(dates.dtype)
+        now_i8 = np.datetime64(current_datetime, unit).view("i8")
+        dates_i8, invalid_dates_mask = flag_future_dates(dates.view("i8"), now_i8)
+        df_to_validate["DateSubmitted"] = dates_i8.view(dates.dtype)
         
-        if invalid_dates_mask.sum() > 0:
-            print(f"Found supicious entries:\n{df_to_validate[invalid_dates_mask]}")
+        if invalid_dates_mask.any():
+            # Positional take skips the label-alignment path of boolean __getitem__
+            print(f"Found supicious entries:\n{df_to_validate.take(np.flatnonzero(invalid_dates_mask))}")
             print(f"Supicious entries will be dropped.")
-            df_to_validate = df_to_validate[~invalid_dates_mask]
+            df_to_validate = df_to_validate.take(np.flatnonzero(~invalid_dates_mask))
     
     result["validated_df"] = df_to_validate 
     return result
 
+# Load the template at startup so config errors show up immediately
+load_template()
+
+
+
+# Banned phrases for prompt injection detection
+BANNED_PHRASES = [
+    "ignore previous",
+    "ignore all previous",
+    "disregard previous",
+    "forget previous",
+    "return only",
+    "show me the",
+    "give me the",
+    "give me api",
+    "give api",
+    "what is the api",
+    "what is the secret",
+    "what is the password",
+    "what is the token",
+    "reveal the",
+    "expose the",
+    "display the",
+    "output the",
+    "print the",
+    "api token",
+    "api key",
+    "apikey"
+]
+
+# Banned individual words
+BANNED_WORDS = [
+    "secret",
+    "token",
+    "password",
+    "apikey",
+    "api_key",
+    "credentials",
+    "privatekey",
+    "private_key"
+]
+
+# Prompts longer than this are rejected before any scanning
+MAX_TEXT_LEN = int(os.environ.get("FILTER_MAX_TEXT_LEN", 10000))
+
+# ---- PROMPT INJECTION MATCHER ----
+# Built once at import; payload is (priority, kind, match) so the phrase/word
+# precedence of the original list order is kept when several entries hit.
+BANNED_ENTRIES = [
+    (kind, entry)
+    for kind, entries in (("phrase", BANNED_PHRASES), ("word", BANNED_WORDS))
+    for entry in entries
+]
+
+banned_automaton = None
+if ahocorasick is not None:
+    banned_automaton = ahocorasick.Automaton()
+    for priority, (kind, entry) in enumerate(BANNED_ENTRIES):
+        if entry not in banned_automaton:
+            banned_automaton.add_word(entry, (priority, kind, entry))
+    banned_automaton.make_automaton()
+
+# Fallback without pyahocorasick: entries are ASCII, so a bytes search over the
+# UTF-8 encoded text finds the same matches on the faster bytes.__contains__ path
+_BANNED_ENTRIES_B = [(kind, entry, entry.encode('ascii')) for kind, entry in BANNED_ENTRIES]
+
+def find_banned(text_lower):
+    # Returns (kind, match) for the highest-precedence banned entry, or None
+    if banned_automaton is not None:
+        hits = [payload for _, payload in banned_automaton.iter(text_lower)]
+        if hits:
+            _, kind, match = min(hits)
+            return kind, match
+        return None
+
+    text_b = text_lower.encode('utf-8')
+    for kind, match, match_b in _BANNED_ENTRIES_B:
+        if match_b in text_b:
+            return kind, match
+    return None
+
+# Filtering is a pure function of the text, so repeated prompts skip the scan.
+# Keyed on a 16-byte digest so each entry stays small regardless of prompt size.
+DECISION_CACHE_SIZE = 8192
+_decision_cache = OrderedDict()
+_decision_lock = threading.Lock()
+
+def decide(text):
+    key = hashlib.blake2b(text.encode("utf-8", "surrogatepass"), digest_size=16).digest()
+    with _decision_lock:
+        if key in _decision_cache:
+            _decision_cache.move_to_end(key)
+            return _decision_cache[key]
+
+    decision = find_banned(text.lower())
+    with _decision_lock:
+        _decision_cache[key] = decision
+        if len(_decision_cache) > DECISION_CACHE_SIZE:
+            _decision_cache.popitem(last=False)
+    return decision
 
 
 @app.route('/filter', methods=['POST'])
 def filter_prompt():
-    data = request.get_json()
+    data = read_json()
     text = data.get("text", "")
-    text_lower = text.lower()
-
-    # Banned phrases for prompt injection detection
-    banned_phrases = [
-        "ignore previous",
-        "ignore all previous",
-        "disregard previous",
-        "forget previous",
-        "return only",
-        "show me the",
-        "give me the",
-        "give me api",
-        "give api",
-        "what is the api",
-        "what is the secret",
-        "what is the password",
-        "what is the token",
-        "reveal the",
-        "expose the",
-        "display the",
-        "output the",
-        "print the",
-        "api token",
-        "api key",
-        "apikey"
-    ]
-    
-    # Banned individual words
-    banned_words = [
-        "secret",
-        "token",
-        "password",
-        "apikey",
-        "api_key",
-        "credentials",
-        "privatekey",
-        "private_key"
-    ]
-    
-    # Check for banned phrases first
-    for phrase in banned_phrases:
-        if phrase in text_lower:
-            print(f"🚫 Blocked: phrase '{phrase}' in '{text}'")
-            return jsonify({"allowed": False, "reason": f"Contains banned phrase: {phrase}", "filtered_text": text}), 200
-    
-    # Check for banned words
-    for word in banned_words:
-        if word in text_lower:
-            print(f"🚫 Blocked: word '{word}' in '{text}'")
-            return jsonify({"allowed": False, "reason": f"Contains banned word: {word}", "filtered_text": text}), 200
+    if len(text) > MAX_TEXT_LEN:
+        print(f"🚫 Blocked: text of length {len(text)} exceeds {MAX_TEXT_LEN}")
+        return json_response({"allowed": False, "reason": f"Text exceeds maximum length of {MAX_TEXT_LEN} characters", "filtered_text": text}), 200
+
+    # Phrases take precedence over words
+    banned = decide(text)
+    if banned:
+        kind, match = banned
+        print(f"🚫 Blocked: {kind} '{match}' in '{text}'")
+        return json_response({"allowed": False, "reason": f"Contains banned {kind}: {match}", "filtered_text": text}), 200
 
-    return jsonify({"allowed": True, "filtered_text": text}), 200
+    return json_response({"allowed": True, "filtered_text": text}), 200
 
 @app.route('/verifyfile', methods=['POST'])
 def verify_file():
     
-    if not template_stru:
+    tmpl = load_template()
+    if not tmpl["template"]:
         # If config is missing, return a simple JSON error
-        return jsonify({"allowed": False, "error": "Server configuration error: Expense template not loaded."}), 500
+        return json_response({"allowed": False, "error": "Server configuration error: Expense template not loaded."}), 500
 
     if not request.is_json:
-        return jsonify({"allowed": False, "error": "Server configuration error: Expense template not loaded."}), 400
+        return json_response({"allowed": False, "error": "Server configuration error: Expense template not loaded."}), 400
 
     try:
-        data = request.get_json()
+        data = read_json()
         rows = None
         if isinstance(data,list) and len(data) > 0 and 'data' in data[0] and isinstance(data[0]['data'], list):
             rows = data[0]["data"]
@@ -165,22 +341,24 @@ def verify_file():
             rows = data
         
         if not rows:
-            return jsonify({"allowed": False, "error": "Expected list of rows"})
+            return json_response({"allowed": False, "error": "Expected list of rows"})
         
         
-        df = pd.DataFrame(rows)
-        validated_df = validate_expense_report(df, template_stru)
+        # Build as object columns and skip per-column type inference;
+        # validate_expense_report coerces the typed template columns itself
+        df = pd.DataFrame(rows, dtype=object)
+        validated_df = tmpl["validate"](df)
 
         if validated_df['is_valid'] is False:
-            return jsonify({"allowed": False, "error":"Required columns were missing"}), 200
+            return json_response({"allowed": False, "error":"Required columns were missing"}), 200
         
-        # Convert NaN to None for valid JSON
-        clean_df = validated_df["validated_df"].fillna("")
-        return jsonify({"allowed": True,"validated_data": clean_df.to_dict(orient="records")})
+        # NaN/NaT are serialized as null by json_response
+        records = dataframe_records(validated_df["validated_df"])
+        return json_response({"allowed": True,"validated_data": records})
 
 
     except Exception as e:
-        return jsonify({"allowed": False, "error": f"An unexpected error occurred: {e}"}), 500
+        return json_response({"allowed": False, "error": f"An unexpected error occurred: {e}"}), 500
     
 @app.route('/health', methods=['GET'])
 def health():
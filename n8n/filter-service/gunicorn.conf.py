@@ -0,0 +1,15 @@
+import os
+
+# ---- GUNICORN SETTINGS FOR THE FILTER SERVICE ----
+# Picked up automatically when gunicorn is started from this directory.
+# /verifyfile is CPU-bound pandas work, so scale workers with the CPU
+# count; a couple of threads per worker cover the I/O wait on /filter.
+bind = "0.0.0.0:5001"
+# CPUs this process may run on (what nproc reports), not the host's core count
+workers = int(os.environ.get("FILTER_WORKERS", len(os.sched_getaffinity(0))))
+threads = int(os.environ.get("FILTER_THREADS", 2))
+worker_class = "gthread"
+
+# Import filter.py (pandas, numpy, pyarrow) once in the master and fork the
+# workers from it, so the heavy imports are paid once and shared copy-on-write
+preload_app = True
@@ -1,11 +1,26 @@
 import requests
 import os
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# Optional: `pip install requests-toolbelt` streams the upload instead of
+# buffering the whole file in memory
+try:
+    from requests_toolbelt import MultipartEncoder
+except ImportError:
+    MultipartEncoder = None
 
 # --- CONFIGURATION ---
 WEBHOOK_URL = "http://localhost:5678/webhook-test/submit-expense"
 EXCEL_FILE_PATH = "expenseUpload.xls"
 FORM_DATA_KEY = "excel_file"
 
+# Shared session so repeated uploads reuse the pooled connection
+_SESSION = requests.Session()
+_ADAPTER = HTTPAdapter(pool_maxsize=16, max_retries=Retry(total=3, backoff_factor=0.2))
+_SESSION.mount("http://", _ADAPTER)
+_SESSION.mount("https://", _ADAPTER)
+
 
 def upload_file_to_webhook(url, file_path, form_key):
     if not os.path.exists(file_path):
@@ -20,7 +35,12 @@ def upload_file_to_webhook(url, file_path, form_key):
         with open(file_path, 'rb') as f:
             files = {form_key: (os.path.basename(file_path), f, 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')}
 
-            response = requests.post(url, files=files)
+            if MultipartEncoder is not None:
+                # Stream the multipart body from the open file instead of buffering it
+                encoder = MultipartEncoder(fields=files)
+                response = _SESSION.post(url, data=encoder, headers={'Content-Type': encoder.content_type}, timeout=(2, 30))
+            else:
+                response = _SESSION.post(url, files=files, timeout=(2, 30))
 
         # Print the response details
         print(f"✅ Upload successful. Status Code: {response.status_code}")
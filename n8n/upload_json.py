@@ -1,4 +1,12 @@
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# Shared session so repeated sends reuse the pooled connection
+_SESSION = requests.Session()
+_ADAPTER = HTTPAdapter(pool_maxsize=16, max_retries=Retry(total=3, backoff_factor=0.2))
+_SESSION.mount("http://", _ADAPTER)
+_SESSION.mount("https://", _ADAPTER)
 
 def send_to_webhook(webhook_url, api_key, data):
     #payload = {"text": text}
@@ -8,7 +16,7 @@ def send_to_webhook(webhook_url, api_key, data):
     }
     
     try:
-        response = requests.post(webhook_url, json=data, headers=headers)
+        response = _SESSION.post(webhook_url, json=data, headers=headers, timeout=(2, 10))
         response.raise_for_status()
         return response
     except requests.RequestException as e: